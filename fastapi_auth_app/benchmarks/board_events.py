@@ -0,0 +1,74 @@
+"""Memory per idle subscriber and broadcast latency of the board event hub.
+
+Subscribers consume the same SSE generator the /boards/{id}/events endpoint
+returns, minus the HTTP layer. A few deliberately stalled subscribers show
+the backpressure policy: they get dropped once their queue fills up.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+from fastapi_auth_app.events import BoardEventHub
+from .common import percentile
+
+
+async def run(args):
+    hub = BoardEventHub(queue_size=args.queue_size)
+    received = asyncio.Queue()
+
+    async def consume(subscription):
+        async for chunk in hub.stream(subscription, keepalive=3600):
+            if chunk.startswith(b"event:"):
+                received.put_nowait(time.perf_counter())
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    consumers = [asyncio.create_task(consume(hub.subscribe(1))) for _ in range(args.subscribers)]
+    await asyncio.sleep(0)  # let every consumer reach its first await
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    per_subscriber = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / args.subscribers
+
+    stalled = [hub.subscribe(1) for _ in range(args.stalled)]  # never read
+
+    latencies = []
+    for i in range(args.broadcasts):
+        started = time.perf_counter()
+        hub.publish(1, "task.created", {"id": i, "title": f"task {i}", "status": "To Do"})
+        last = started
+        for _ in range(args.subscribers):
+            last = max(last, await received.get())
+        latencies.append(last - started)
+
+    for consumer in consumers:
+        consumer.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    return {
+        "subscribers": args.subscribers,
+        "bytes_per_subscriber": round(per_subscriber),
+        "broadcasts": args.broadcasts,
+        "broadcast_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "broadcast_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "broadcast_mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "stalled_subscribers": args.stalled,
+        "stalled_dropped": sum(subscription.dropped for subscription in stalled),
+        "hub": hub.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--broadcasts", type=int, default=200)
+    parser.add_argument("--stalled", type=int, default=10)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
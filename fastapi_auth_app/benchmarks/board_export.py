@@ -0,0 +1,121 @@
+"""Peak RSS and rows/s for streaming a large board out through /boards/{id}/export and back in through /import.
+
+The app is called over raw ASGI with a sink that only counts bytes, so the
+client side never holds the body in memory. SQLite's mmap and page cache
+count towards RSS too; run with SQLITE_MMAP_SIZE=0 SQLITE_CACHE_SIZE_KB=2000
+to see the app's own footprint.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+from fastapi_auth_app import models
+from .common import make_app, seed
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)  # ru_maxrss is KiB on Linux
+
+
+def fill_board(SessionLocal, board_id, user_id, n_tasks, subtasks_per_task, batch=10000):
+    engine = SessionLocal.kw["bind"]
+    with engine.begin() as conn:
+        next_id = 1
+        for start in range(0, n_tasks, batch):
+            count = min(batch, n_tasks - start)
+            conn.execute(models.Task.__table__.insert(), [
+                {"id": next_id + j, "title": f"task {start + j}", "description": "lorem ipsum " * 10,
+                 "status": "To Do", "board_id": board_id, "assignee_id": user_id}
+                for j in range(count)
+            ])
+            if subtasks_per_task:
+                conn.execute(models.Subtask.__table__.insert(), [
+                    {"task_id": next_id + j, "title": f"subtask {k}"}
+                    for j in range(count) for k in range(subtasks_per_task)
+                ])
+            next_id += count
+
+
+async def call(app, method, path, token, body_chunks=()):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"host", b"bench")],
+    }
+    chunks = iter(body_chunks)
+    received = {"status": None, "bytes": 0, "body": b""}
+    body_done = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal body_done
+        if body_done:
+            # like a real server: nothing more until the client goes away
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+        chunk = next(chunks, None)
+        if chunk is None:
+            body_done = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            received["bytes"] += len(message.get("body", b""))
+            if received["bytes"] < 4096:
+                received["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    response_done.set()
+    return received
+
+
+def ndjson_chunks(n_tasks, subtasks_per_task, lines_per_chunk=500):
+    line = json.dumps({"title": "imported", "description": "lorem ipsum " * 10,
+                       "subtasks": [{"title": f"subtask {k}"} for k in range(subtasks_per_task)]}) + "\n"
+    for start in range(0, n_tasks, lines_per_chunk):
+        yield (line * min(lines_per_chunk, n_tasks - start)).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--subtasks", type=int, default=1, help="subtasks per task")
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    [(token, board_id)] = seed(SessionLocal, n_users=1, tasks_per_board=0)
+    started = time.perf_counter()
+    fill_board(SessionLocal, board_id, 1, args.tasks, args.subtasks)
+    results = {"tasks": args.tasks, "seed_s": round(time.perf_counter() - started, 1), "rss_after_seed_mb": peak_rss_mb()}
+
+    async def run():
+        started = time.perf_counter()
+        export = await call(app, "GET", f"/boards/{board_id}/export", token)
+        elapsed = time.perf_counter() - started
+        assert export["status"] == 200, export
+        results["export"] = {
+            "rows_per_s": round(args.tasks / elapsed), "mb": round(export["bytes"] / 2**20, 1),
+            "seconds": round(elapsed, 2), "peak_rss_mb": peak_rss_mb(),
+        }
+
+        started = time.perf_counter()
+        imported = await call(app, "POST", f"/boards/{board_id}/import", token, ndjson_chunks(args.tasks, args.subtasks))
+        elapsed = time.perf_counter() - started
+        assert imported["status"] == 200, imported
+        results["import"] = {
+            "rows_per_s": round(args.tasks / elapsed), "seconds": round(elapsed, 2),
+            "peak_rss_mb": peak_rss_mb(), "response": json.loads(imported["body"]),
+        }
+
+    asyncio.run(run())
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
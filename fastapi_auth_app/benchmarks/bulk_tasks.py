@@ -0,0 +1,45 @@
+"""Rows per second creating tasks one request at a time vs through POST /tasks/bulk."""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from .common import make_app, seed, drive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000, help="tasks per bulk request")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel per-row requests")
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    [(token, board_id)] = seed(SessionLocal, n_users=1, tasks_per_board=0)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def create_one(client, i):
+        return await client.post("/tasks/", json={"title": f"row {i}", "board_id": board_id}, headers=headers)
+
+    async def run():
+        per_row = await drive(app, create_one, args.rows, args.concurrency)
+        per_row["rows_per_s"] = per_row.pop("rps")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            for start in range(0, args.rows, args.batch):
+                tasks = [{"title": f"bulk {i}", "board_id": board_id} for i in range(start, min(args.rows, start + args.batch))]
+                response = await client.post("/tasks/bulk", json={"tasks": tasks}, headers=headers)
+                response.raise_for_status()
+            elapsed = time.perf_counter() - started
+        bulk = {"rows": args.rows, "batch": args.batch, "rows_per_s": round(args.rows / elapsed, 1)}
+        return {"per_row": per_row, "bulk": bulk, "speedup": round(bulk["rows_per_s"] / per_row["rows_per_s"], 1)}
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark runs the real routers in-process over ASGI against a throwaway
+SQLite file, so numbers are comparable between runs on the same machine.
+Run them from the ``fastapi_auth_app`` directory, e.g.::
+
+    python -m benchmarks.principal_cache
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from fastapi_auth_app import auth, migrate, models, utils
+from fastapi_auth_app.database import apply_sqlite_pragmas, engine_options, get_db
+from fastapi_auth_app.instrumentation import QueryCountMiddleware
+from fastapi_auth_app.routes import users, boards, tasks
+
+
+def make_app(db_path=None, pragmas=None):
+    """Return ``(app, SessionLocal)`` wired to a fresh SQLite database.
+
+    The app talks to it through aiosqlite; ``SessionLocal`` is a sync session
+    factory on the same file for seeding. Engines are set up like the app's own,
+    with ``pragmas`` overriding ``database.SQLITE_PRAGMAS`` when given.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="trello-bench-"), "bench.db")
+    url = f"sqlite:///{db_path}"
+    engine = create_engine(url, **engine_options(url))
+    apply_sqlite_pragmas(engine, pragmas)
+    migrate.migrate(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    async_url = f"sqlite+aiosqlite:///{db_path}"
+    async_engine = create_async_engine(async_url, **engine_options(async_url))
+    apply_sqlite_pragmas(async_engine.sync_engine, pragmas)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware)
+    app.include_router(users.router)
+    app.include_router(boards.router)
+    app.include_router(tasks.router)
+    app.dependency_overrides[get_db] = override_get_db
+    return app, SessionLocal
+
+
+def seed(SessionLocal, n_users=10, tasks_per_board=50, password="secret"):
+    """Create users that each own one board with some tasks; return their tokens and board ids."""
+    hashed = utils.hash_password(password)
+    db = SessionLocal()
+    try:
+        result = []
+        for i in range(n_users):
+            user = models.User(username=f"user{i}", email=f"user{i}@example.com", password=hashed)
+            db.add(user)
+            db.flush()
+            board = models.Board(name=f"board {i}", owner_id=user.id)
+            db.add(board)
+            db.flush()
+            db.add(models.BoardMember(board_id=board.id, user_id=user.id, role="owner"))
+            db.add_all(
+                models.Task(title=f"task {j}", description="x" * 200, board_id=board.id, assignee_id=user.id)
+                for j in range(tasks_per_board)
+            )
+            result.append((auth.create_access_token({"sub": user.username}), board.id))
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0, query_counts=()):
+    summary = {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "errors": errors,
+    }
+    if query_counts:
+        summary["sql_per_request"] = round(statistics.fmean(query_counts), 2)
+        summary["sql_max"] = max(query_counts)
+    return summary
+
+
+async def drive(app, make_request, total, concurrency):
+    """Fire ``total`` requests built by ``make_request(client, i)`` with bounded concurrency.
+
+    Server errors (including unhandled exceptions) are counted, not raised.
+    SQL statement counts are collected from the X-Query-Count header when present.
+    """
+    latencies = []
+    query_counts = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                response = await make_request(client, i)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 500:
+                    errors += 1
+                if "x-query-count" in response.headers:
+                    query_counts.append(int(response.headers["x-query-count"]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, elapsed, errors, query_counts)
@@ -0,0 +1,79 @@
+"""CPU time and bytes sent for a polling workload on /tasks/{board_id} and /boards/all.
+
+Clients poll repeatedly while a writer adds a task every --write-every polls.
+Compares clients that ignore ETags, clients sending If-None-Match, and the
+server-side response cache turned off.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from fastapi_auth_app import versions
+from .common import make_app, seed
+
+
+async def poll(app, sessions, args, conditional):
+    etags = {}
+    sent_bytes = statuses_304 = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cpu_started, started = time.process_time(), time.perf_counter()
+        for i in range(args.polls):
+            token, board_id = sessions[i % len(sessions)]
+            headers = {"Authorization": f"Bearer {token}"}
+            if i and i % args.write_every == 0:
+                await client.post("/tasks/", json={"title": f"poll {i}", "board_id": board_id}, headers=headers)
+            for path in (f"/tasks/{board_id}?limit={args.page}", "/boards/all"):
+                key = (token, path)
+                request_headers = dict(headers)
+                if conditional and key in etags:
+                    request_headers["If-None-Match"] = etags[key]
+                response = await client.get(path, headers=request_headers)
+                sent_bytes += len(response.content)
+                statuses_304 += response.status_code == 304
+                if "etag" in response.headers:
+                    etags[key] = response.headers["etag"]
+        cpu, elapsed = time.process_time() - cpu_started, time.perf_counter() - started
+    return {
+        "requests": args.polls * 2,
+        "not_modified": statuses_304,
+        "body_kb": round(sent_bytes / 1024, 1),
+        "cpu_s": round(cpu, 2),
+        "rps": round(args.polls * 2 / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--write-every", type=int, default=50)
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    sessions = seed(SessionLocal, n_users=args.users, tasks_per_board=args.page)
+
+    async def run():
+        results = {}
+        cache_limit = versions.response_cache.max_bytes
+        for label, conditional, cache_bytes in (
+            ("unconditional_no_cache", False, 0),
+            ("unconditional_cached", False, cache_limit),
+            ("if_none_match_cached", True, cache_limit),
+        ):
+            versions.response_cache.clear()
+            versions.response_cache.max_bytes = cache_bytes
+            versions.response_cache.hits = versions.response_cache.misses = 0
+            results[label] = await poll(app, sessions, args, conditional)
+            results[label]["response_cache"] = versions.response_cache.stats()
+        return results
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""p99 latency of GET /tasks/{board_id} on its own and while a login storm is running.
+
+Tune the hashing pool with PASSWORD_HASH_WORKERS / PASSWORD_HASH_QUEUE /
+PASSWORD_HASH_EXECUTOR to compare configurations.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from fastapi_auth_app import utils
+from .common import make_app, seed, drive
+
+
+def tasks_request(sessions):
+    async def get_tasks(client, i):
+        token, board_id = sessions[i % len(sessions)]
+        return await client.get(f"/tasks/{board_id}", headers={"Authorization": f"Bearer {token}"})
+    return get_tasks
+
+
+async def storm(app, sessions, args):
+    stop = asyncio.Event()
+    outcomes = {"ok": 0, "rejected": 0}
+
+    async def login_loop(client):
+        while not stop.is_set():
+            i = outcomes["ok"] + outcomes["rejected"]
+            response = await client.post("/users/login", json={
+                "username": f"user{i % len(sessions)}",
+                "email": f"user{i % len(sessions)}@example.com",
+                "password": "secret",
+                "login_type": "bench",
+            })
+            outcomes["ok" if response.status_code == 200 else "rejected"] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        logins = [asyncio.create_task(login_loop(client)) for _ in range(args.login_concurrency)]
+        await asyncio.sleep(0.5)  # let the storm build up first
+        started = time.perf_counter()
+        result = await drive(app, tasks_request(sessions), args.requests, args.concurrency)
+        stop.set()
+        await asyncio.gather(*logins)
+    result["logins"] = outcomes
+    result["logins_per_s"] = round(sum(outcomes.values()) / (time.perf_counter() - started), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    sessions = seed(SessionLocal, n_users=10, tasks_per_board=50)
+
+    async def run():
+        # first requests pay for connection setup, principal/membership caches and code paths
+        # warming up; without this the idle pass looks worse than the one under load
+        await drive(app, tasks_request(sessions), args.requests, args.concurrency)
+        return {
+            "hasher": {"workers": utils.hasher.workers, "queue_limit": utils.hasher.queue_limit, "kind": utils.hasher.kind},
+            "idle": await drive(app, tasks_request(sessions), args.requests, args.concurrency),
+            "during_logins": await storm(app, sessions, args),
+        }
+
+    results = asyncio.run(run())
+    utils.hasher.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Task endpoint throughput with the board-membership cache on and off."""
+import argparse
+import asyncio
+import json
+
+from fastapi_auth_app import permissions
+from .common import make_app, seed, drive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    sessions = seed(SessionLocal, n_users=args.users, tasks_per_board=20)
+
+    async def list_tasks(client, i):
+        token, board_id = sessions[i % len(sessions)]
+        return await client.get(f"/tasks/{board_id}?limit=20", headers={"Authorization": f"Bearer {token}"})
+
+    async def create_task(client, i):
+        token, board_id = sessions[i % len(sessions)]
+        return await client.post("/tasks/", json={"title": f"bench {i}", "board_id": board_id},
+                                 headers={"Authorization": f"Bearer {token}"})
+
+    cache = permissions.backend
+    maxsize = cache.maxsize or 50000
+
+    async def run():
+        results = {}
+        for label, size in (("cache_off", 0), ("cache_on", maxsize)):
+            cache.clear()
+            cache.maxsize = size
+            cache.hits = cache.misses = 0
+            results[label] = {
+                "get_tasks": await drive(app, list_tasks, args.requests, args.concurrency),
+                "create_task": await drive(app, create_task, args.requests // 4, args.concurrency),
+                "cache": cache.stats(),
+            }
+        return results
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Requests per second on authenticated routes with the principal cache on and off."""
+import argparse
+import asyncio
+import json
+
+from fastapi_auth_app import auth
+from .common import make_app, seed, drive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    sessions = seed(SessionLocal, n_users=args.users, tasks_per_board=5)
+
+    async def list_boards(client, i):
+        token, _ = sessions[i % len(sessions)]
+        return await client.get("/boards/all", headers={"Authorization": f"Bearer {token}"})
+
+    async def run():
+        results = {}
+        for label, maxsize in (("cache_off", 0), ("cache_on", auth.principal_cache.maxsize or 10000)):
+            auth.principal_cache.clear()
+            auth.principal_cache.maxsize = maxsize
+            auth.principal_cache.hits = auth.principal_cache.misses = 0
+            results[label] = await drive(app, list_boards, args.requests, args.concurrency)
+            results[label]["cache"] = auth.principal_cache.stats()
+        return results
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
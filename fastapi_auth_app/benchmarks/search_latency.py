@@ -0,0 +1,74 @@
+"""Task search latency: FTS5 index vs a LIKE '%q%' scan, at --tasks rows (1M by default)."""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from sqlalchemy import text
+
+from fastapi_auth_app import models
+from .common import make_app, seed, drive, percentile
+
+# ~27k made-up words, so a term matches a realistic handful of tasks rather than most of them
+SYLLABLES = ("ka", "lo", "mi", "nu", "pe", "ra", "si", "to", "vu", "ze", "ba", "de", "fi", "go", "hu",
+             "ja", "ke", "li", "mo", "ne", "po", "qu", "ru", "sa", "te", "vi", "wo", "xa", "yo", "zu")
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+def fill(SessionLocal, board_ids, n_tasks, batch=20000):
+    rng = random.Random(42)
+    engine = SessionLocal.kw["bind"]
+    with engine.begin() as conn:
+        for start in range(0, n_tasks, batch):
+            conn.execute(models.Task.__table__.insert(), [
+                {"title": " ".join(rng.choices(WORDS, k=4)), "description": " ".join(rng.choices(WORDS, k=20)),
+                 "status": "To Do", "board_id": rng.choice(board_ids)}
+                for _ in range(min(batch, n_tasks - start))
+            ])
+
+
+def time_sql(engine, sql, terms):
+    latencies = []
+    with engine.connect() as conn:
+        for term in terms:
+            started = time.perf_counter()
+            conn.execute(text(sql), {"q": term}).fetchall()
+            latencies.append(time.perf_counter() - started)
+    return {"p50_ms": round(percentile(latencies, 50) * 1000, 2), "p99_ms": round(percentile(latencies, 99) * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    app, SessionLocal = make_app()
+    sessions = seed(SessionLocal, n_users=10, tasks_per_board=0)
+    started = time.perf_counter()
+    fill(SessionLocal, [board_id for _, board_id in sessions], args.tasks)
+    results = {"tasks": args.tasks, "seed_s": round(time.perf_counter() - started, 1)}
+
+    engine = SessionLocal.kw["bind"]
+    terms = random.Random(7).choices(WORDS, k=args.queries)
+    results["fts5_sql"] = time_sql(engine, """
+        SELECT rowid FROM task_search WHERE task_search MATCH :q
+        ORDER BY bm25(task_search, 10.0, 1.0, 3.0) LIMIT 20""", [f'"{t}"' for t in terms])
+    results["like_sql"] = time_sql(engine, """
+        SELECT id FROM tasks WHERE title LIKE '%' || :q || '%' OR description LIKE '%' || :q || '%'
+        LIMIT 20""", terms)
+    # LIKE can stop at the first 20 hits; ranking needs every match, which is the fair comparison
+    results["like_sql_all_matches"] = time_sql(engine, """
+        SELECT count(*) FROM tasks WHERE title LIKE '%' || :q || '%' OR description LIKE '%' || :q || '%'""", terms[:5])
+
+    async def search(client, i):
+        token, _ = sessions[i % len(sessions)]
+        return await client.get(f"/tasks/search?q={terms[i % len(terms)]}", headers={"Authorization": f"Bearer {token}"})
+
+    results["endpoint"] = asyncio.run(drive(app, search, args.queries, 4))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
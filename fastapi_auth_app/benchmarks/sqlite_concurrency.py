@@ -0,0 +1,43 @@
+"""Concurrent task creation and listing with the default rollback journal vs the app's SQLite pragmas."""
+import argparse
+import asyncio
+import json
+
+from fastapi_auth_app.database import SQLITE_PRAGMAS
+from .common import make_app, seed, drive
+
+
+async def mixed_workload(app, sessions, args):
+    async def create_task(client, i):
+        token, board_id = sessions[i % len(sessions)]
+        return await client.post("/tasks/", json={"title": f"bench {i}", "board_id": board_id},
+                                 headers={"Authorization": f"Bearer {token}"})
+
+    async def list_tasks(client, i):
+        token, board_id = sessions[i % len(sessions)]
+        return await client.get(f"/tasks/{board_id}", headers={"Authorization": f"Bearer {token}"})
+
+    writes, reads = await asyncio.gather(
+        drive(app, create_task, args.requests, args.concurrency),
+        drive(app, list_tasks, args.requests, args.concurrency),
+    )
+    return {"writes": writes, "reads": reads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    results = {}
+    for label, pragmas in (("rollback_journal", {}), ("wal_pragmas", SQLITE_PRAGMAS)):
+        app, SessionLocal = make_app(pragmas=pragmas)
+        sessions = seed(SessionLocal, n_users=10, tasks_per_board=100)
+        results[label] = asyncio.run(mixed_workload(app, sessions, args))
+    results["wal_pragmas"]["pragmas"] = SQLITE_PRAGMAS
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Worker startup time, and bytes transferred for the frontend before and after ``assets.build``.
+
+Startup: each run is a fresh interpreter that imports ``main`` and enters the
+app's lifespan against an already migrated database, once as workers now boot
+and once with MIGRATE_ON_STARTUP=1 (the DDL every worker used to run at import).
+
+Assets: every HTML page and the files it references are fetched from plain
+StaticFiles over ``frontend/`` and from PrecompressedStaticFiles over a fresh
+build. The repeat visit replays them with the ETags from the first one, except
+for responses marked immutable, which a browser would not request again.
+"""
+import argparse
+import asyncio
+import json
+import os
+import posixpath
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import httpx
+from starlette.staticfiles import StaticFiles
+
+from fastapi_auth_app import assets
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT = """
+import asyncio, json, time
+started = time.perf_counter()
+from fastapi_auth_app import main
+imported = time.perf_counter()
+from fastapi_auth_app.instrumentation import count_queries
+
+async def boot():
+    with count_queries() as counter:
+        async with main.app.router.lifespan_context(main.app):
+            ready = time.perf_counter()
+    return ready, counter.count
+
+ready, statements = asyncio.run(boot())
+print(json.dumps({"import_s": imported - started, "ready_s": ready - started, "statements": statements}))
+"""
+
+
+def boot_once(db_path, migrate_on_startup):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "MIGRATE_ON_STARTUP": "1" if migrate_on_startup else "0"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    output = subprocess.run([sys.executable, "-c", BOOT], cwd=PROJECT_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def measure_startup(runs):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="trello-startup-"), "startup.db")
+    boot_once(db_path, migrate_on_startup=True)  # create the schema, as a deploy would
+    results = {}
+    for name, migrate_on_startup in (("no_ddl", False), ("migrate_on_startup", True)):
+        samples = [boot_once(db_path, migrate_on_startup) for _ in range(runs)]
+        results[name] = {
+            "import_ms": round(statistics.median(s["import_s"] for s in samples) * 1000, 1),
+            "ready_ms": round(statistics.median(s["ready_s"] for s in samples) * 1000, 1),
+            "sql_statements": samples[-1]["statements"],
+        }
+    return results
+
+
+async def visit(app, pages, accept_encoding, cache=None):
+    """Fetch ``pages`` and what they reference; ``cache`` (from an earlier visit) makes it a repeat visit."""
+    fetched, total, requests = {}, 0, 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = list(pages)
+        while queue:
+            path = queue.pop(0)
+            if path in fetched:
+                continue
+            headers = {"Accept-Encoding": accept_encoding}
+            earlier = (cache or {}).get(path)
+            if earlier is not None and "immutable" in earlier["headers"].get("cache-control", ""):
+                fetched[path] = earlier
+                continue
+            if earlier is not None and "etag" in earlier["headers"]:
+                headers["If-None-Match"] = earlier["headers"]["etag"]
+            response = await client.get("/" + path, headers=headers)
+            requests += 1
+            # headers are not counted: only the (possibly compressed) body on the wire
+            total += response.num_bytes_downloaded
+            if response.status_code == 304:
+                fetched[path] = earlier
+            else:
+                fetched[path] = {"headers": response.headers, "text": response.text}
+            if path.endswith(".html"):
+                page_dir = posixpath.dirname(path)
+                for match in assets._REFERENCE.finditer(fetched[path]["text"]):
+                    reference = match.group(2)
+                    if "://" not in reference and not reference.startswith(("#", "data:", "mailto:")):
+                        queue.append(posixpath.normpath(posixpath.join(page_dir, reference.lstrip("/"))))
+    return {"requests": requests, "bytes": total}, fetched
+
+
+async def measure_assets(accept_encoding):
+    build_dir = os.path.join(tempfile.mkdtemp(prefix="trello-assets-"), "dist")
+    assets.build(assets.FRONTEND_DIR, build_dir)
+    pages = sorted(name for name in os.listdir(assets.FRONTEND_DIR) if name.endswith(".html"))
+    results = {}
+    for name, app in (
+        ("plain", StaticFiles(directory=assets.FRONTEND_DIR, html=True)),
+        ("built", assets.PrecompressedStaticFiles(directory=build_dir, html=True)),
+    ):
+        first, cache = await visit(app, pages, accept_encoding)
+        repeat, _ = await visit(app, pages, accept_encoding, cache)
+        results[name] = {"first_visit": first, "repeat_visit": repeat}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="interpreter starts per startup mode")
+    parser.add_argument("--accept-encoding", default="br, gzip")
+    args = parser.parse_args()
+
+    results = {
+        "startup": measure_startup(args.runs),
+        "assets": asyncio.run(measure_assets(args.accept_encoding)),
+        "brotli": assets.brotli is not None,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""End-to-end benchmark suite for ``main.app``.
+
+Seeds users, boards, members, tasks and subtasks at a configurable scale into
+a throwaway database, then drives the real application in-process over ASGI:
+register, login, GET /boards/all, GET /tasks/{board_id} and POST /tasks/.
+Throughput, p50/p95/p99 latency and SQL statements per request are printed
+and saved as JSON; pass a previous file with --compare to flag regressions::
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(PROJECT_DIR)
+
+
+def load_app(db_path):
+    # database.py reads DATABASE_URL at import, so nothing from fastapi_auth_app
+    # (benchmarks.common included) may be imported before this
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    from fastapi_auth_app import main, database, migrate
+    migrate.migrate()
+    return main.app, database
+
+
+def seed(database, args):
+    from fastapi_auth_app import auth, models, utils
+
+    rng = random.Random(args.seed)
+    hashed = utils.hash_password("secret")
+    engine = database.engine
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": u, "username": f"user{u}", "email": f"user{u}@example.com", "password": hashed}
+            for u in range(1, args.users + 1)
+        ])
+        boards, members = [], []
+        for u in range(1, args.users + 1):
+            for _ in range(args.boards_per_user):
+                board_id = len(boards) + 1
+                boards.append({"id": board_id, "name": f"board {board_id}", "owner_id": u})
+                members.append({"board_id": board_id, "user_id": u, "role": "owner"})
+                others = [m for m in range(1, args.users + 1) if m != u]
+                for m in rng.sample(others, min(args.members_per_board, len(others))):
+                    members.append({"board_id": board_id, "user_id": m, "role": "member"})
+        conn.execute(models.Board.__table__.insert(), boards)
+        conn.execute(models.BoardMember.__table__.insert(), members)
+
+        task_id = 0
+        for board in boards:
+            tasks = []
+            for _ in range(args.tasks_per_board):
+                task_id += 1
+                tasks.append({"id": task_id, "title": f"task {task_id}", "description": "lorem ipsum " * 20,
+                              "status": rng.choice(["To Do", "Doing", "Done"]), "board_id": board["id"],
+                              "assignee_id": board["owner_id"]})
+            if tasks:
+                conn.execute(models.Task.__table__.insert(), tasks)
+                if args.subtasks_per_task:
+                    conn.execute(models.Subtask.__table__.insert(), [
+                        {"task_id": task["id"], "title": f"subtask {k}"}
+                        for task in tasks for k in range(args.subtasks_per_task)
+                    ])
+
+    # each session: a user's token and one board they own
+    return [
+        (auth.create_access_token({"sub": f"user{board['owner_id']}"}), board["id"])
+        for board in boards
+    ]
+
+
+def scenarios(sessions, args):
+    def headers(i):
+        return {"Authorization": f"Bearer {sessions[i % len(sessions)][0]}"}
+
+    def board(i):
+        return sessions[i % len(sessions)][1]
+
+    async def register(client, i):
+        return await client.post("/users/register", json={
+            "username": f"new{i}-{time.time_ns()}", "email": f"new{i}@example.com", "password": "secret"})
+
+    async def login(client, i):
+        username = f"user{i % args.users + 1}"
+        return await client.post("/users/login", json={
+            "username": username, "email": f"{username}@example.com", "password": "secret", "login_type": "bench"})
+
+    async def boards_all(client, i):
+        return await client.get("/boards/all", headers=headers(i))
+
+    async def tasks_list(client, i):
+        return await client.get(f"/tasks/{board(i)}", headers=headers(i))
+
+    async def task_create(client, i):
+        return await client.post("/tasks/", json={"title": f"bench {i}", "board_id": board(i)}, headers=headers(i))
+
+    # bcrypt dominates register/login, so they get fewer requests
+    return [
+        ("register", register, args.auth_requests),
+        ("login", login, args.auth_requests),
+        ("boards_all", boards_all, args.requests),
+        ("tasks_list", tasks_list, args.requests),
+        ("task_create", task_create, args.requests),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Scenarios whose throughput dropped or p99 rose by more than ``tolerance`` percent."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        rps_change = (current["rps"] - before["rps"]) / before["rps"] * 100
+        p99_change = (current["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100
+        current["vs_baseline"] = {"rps_pct": round(rps_change, 1), "p99_pct": round(p99_change, 1)}
+        if rps_change < -tolerance or p99_change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--boards-per-user", type=int, default=2)
+    parser.add_argument("--members-per-board", type=int, default=3)
+    parser.add_argument("--tasks-per-board", type=int, default=200)
+    parser.add_argument("--subtasks-per-task", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per board/task scenario")
+    parser.add_argument("--auth-requests", type=int, default=50, help="requests per register/login scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", nargs="*", help="run just these scenarios")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression, in percent")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="trello-suite-"), "suite.db")
+    app, database = load_app(db_path)
+    from .common import drive
+    started = time.perf_counter()
+    sessions = seed(database, args)
+    seed_seconds = round(time.perf_counter() - started, 1)
+
+    async def run():
+        measured = {}
+        for name, make_request, total in scenarios(sessions, args):
+            if args.only and name not in args.only:
+                continue
+            measured[name] = await drive(app, make_request, total, args.concurrency)
+            print(f"{name:12} {json.dumps(measured[name])}", file=sys.stderr)
+        return measured
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed_seconds": seed_seconds,
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": asyncio.run(run()),
+    }
+
+    regressions = []
+    if args.compare:
+        with open(os.path.join(PROJECT_DIR, args.compare) if not os.path.isabs(args.compare) else args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+
+    output = args.output if os.path.isabs(args.output) else os.path.join(PROJECT_DIR, args.output)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"results written to {output}", file=sys.stderr)
+    if regressions:
+        sys.exit(f"regressions beyond {args.tolerance}%: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Build step and static file serving for the frontend.
+
+``build`` copies ``frontend/`` to FRONTEND_BUILD_DIR with every non-HTML file
+renamed to include a hash of its content (``styles.css`` becomes
+``styles.3f9c2a1b7d.css``), rewrites the HTML references to match, and writes
+gzip (and, when the brotli package is installed, brotli) copies next to each
+text file. ``manifest.json`` maps original names to fingerprinted ones::
+
+    python -m fastapi_auth_app.assets build
+
+The app serves the build output when it exists and the plain ``frontend/``
+directory otherwise.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import sys
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip copies are built
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTEND_DIR = os.getenv("FRONTEND_DIR", os.path.normpath(os.path.join(BASE_DIR, "..", "..", "frontend")))
+FRONTEND_BUILD_DIR = os.getenv("FRONTEND_BUILD_DIR", os.path.join(FRONTEND_DIR, "dist"))
+MANIFEST = "manifest.json"
+
+COMPRESSIBLE = {".html", ".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".xml"}
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Fingerprinted files never change under the same name; HTML is always revalidated.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_REFERENCE = re.compile(r'(\b(?:href|src)\s*=\s*["\'])([^"\']+)(["\'])')
+
+
+def build(source_dir: str = FRONTEND_DIR, output_dir: str = FRONTEND_BUILD_DIR):
+    """Write the fingerprinted, precompressed frontend to ``output_dir`` and return the manifest."""
+    source_dir = os.path.abspath(source_dir)
+    output_dir = os.path.abspath(output_dir)
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        # the default output directory lives inside the sources
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != output_dir)
+        files += [os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, "/") for name in sorted(names)]
+
+    manifest = {}
+    for name in files:
+        if name.endswith(".html"):
+            continue
+        with open(os.path.join(source_dir, name), "rb") as f:
+            data = f.read()
+        stem, ext = posixpath.splitext(name)
+        manifest[name] = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+        _write(output_dir, manifest[name], data)
+
+    for name in files:
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(source_dir, name), encoding="utf-8") as f:
+            html = f.read()
+        _write(output_dir, name, _rewrite_references(html, name, manifest).encode("utf-8"))
+
+    with open(os.path.join(output_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def _write(output_dir, name, data):
+    path = os.path.join(output_dir, *name.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if posixpath.splitext(name)[1] not in COMPRESSIBLE:
+        return
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+def _rewrite_references(html, page, manifest):
+    page_dir = posixpath.dirname(page)
+
+    def replace(match):
+        reference = match.group(2)
+        if "://" in reference or reference.startswith(("//", "#", "data:", "mailto:")) or "?" in reference:
+            return match.group(0)
+        if reference.startswith("/"):
+            target = manifest.get(reference.lstrip("/"))
+            new = target and "/" + target
+        else:
+            target = manifest.get(posixpath.normpath(posixpath.join(page_dir, reference)))
+            new = target and posixpath.relpath(target, page_dir or ".")
+        return match.group(1) + new + match.group(3) if new else match.group(0)
+
+    return _REFERENCE.sub(replace, html)
+
+def load_manifest(directory: str):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def static_directory():
+    """The build output when ``build`` has been run, otherwise the plain sources."""
+    if os.path.isfile(os.path.join(FRONTEND_BUILD_DIR, MANIFEST)):
+        return FRONTEND_BUILD_DIR
+    return FRONTEND_DIR
+
+
+def _accepted_encodings(header: str):
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        q = params.replace(" ", "").removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers a ``.br``/``.gz`` copy of the file when the client accepts it.
+
+    Files listed in the directory's manifest get long-lived immutable caching;
+    everything else (HTML above all) must be revalidated with its ETag.
+    """
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = os.path.realpath(directory)
+        self.immutable = set(load_manifest(directory).values())
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        response = self._encoded_response(str(full_path), status_code, request_headers.get("accept-encoding", ""))
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        name = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if name in self.immutable else REVALIDATE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def _encoded_response(self, full_path, status_code, accept_encoding):
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                encoded_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            # the ETag comes from the encoded file, so each encoding validates separately
+            return FileResponse(
+                full_path + suffix,
+                status_code=status_code,
+                stat_result=encoded_stat,
+                media_type=mimetypes.guess_type(full_path)[0] or "text/plain",
+                headers={"Content-Encoding": encoding},
+            )
+        return None
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        sys.exit("usage: python -m fastapi_auth_app.assets build")
+    manifest = build()
+    print(f"{len(manifest)} assets fingerprinted into {FRONTEND_BUILD_DIR}")
@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta, UTC
+import os
+import time
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from . import models
+from .cache import TTLCache
 from .database import get_db
 
 SECRET_KEY = "supersecretkey"
@@ -11,28 +16,108 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def create_access_token(data: dict):
+# Lifetime of the board-scoped tokens EventSource clients put in the URL (they can't send headers).
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+
+# Verified principals keyed by token subject, so authenticated requests skip the users lookup.
+# Set PRINCIPAL_CACHE_SIZE=0 or PRINCIPAL_CACHE_TTL=0 to turn it off.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "300")),
+)
+
+def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
-    expire = datetime.now(UTC) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Invalid authentication credentials",
+def create_stream_token(username: str, board_id: int):
+    """Short-lived token that only opens the board's event stream, for use as ?token=."""
+    return create_access_token(
+        {"sub": username, "scope": f"events:{board_id}"},
+        timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS),
     )
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Invalid authentication credentials",
+)
+
+def _decode(token: str):
     try:
-        token = token.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
+    # every token we issue expires; one without "exp" would be valid forever
+    if payload.get("sub") is None or payload.get("exp") is None:
+        raise credentials_exception
+    return payload
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+async def get_current_user(token: str = Depends(security), db: AsyncSession = Depends(get_db)):
+    payload = _decode(token.credentials)
+    # scoped tokens end up in URLs and logs; they only open what they were issued for
+    if "scope" in payload:
+        raise credentials_exception
+    return await _load_user(payload, db)
+
+async def get_stream_user(
+    board_id: int,
+    token: str | None = None,
+    credentials=Depends(optional_security),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bearer header, or a ``?token=`` from create_stream_token for this board (EventSource can't send headers)."""
+    if credentials is not None:
+        return await get_current_user(credentials, db)
+    if token is None:
+        raise credentials_exception
+    payload = _decode(token)
+    if payload.get("scope") != f"events:{board_id}":
+        raise credentials_exception
+    return await _load_user(payload, db)
+
+async def _load_user(payload: dict, db: AsyncSession):
+    username = payload["sub"]
+    cached = principal_cache.get(username)
+    if cached is not None:
+        # attach a copy to this request's session without emitting a SELECT
+        return await db.merge(cached, load=False)
+
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if not user:
         raise credentials_exception
+    # never keep a principal around longer than the token that proved it
+    principal_cache.set(username, _detached_copy(user), ttl=payload["exp"] - time.time())
     return user
+
+def _detached_copy(user: models.User):
+    copy = models.User(id=user.id, username=user.username, email=user.email, password=user.password)
+    make_transient_to_detached(copy)
+    return copy
+
+def invalidate_user(username: str):
+    principal_cache.delete(username)
+
+# Changed usernames are collected at flush and dropped from the cache only once the
+# change is committed: clearing them at flush would let a request that misses in
+# between re-cache the old committed row for the rest of the TTL.
+_CHANGED_USERS = "changed_usernames"
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _record_changed_user(mapper, connection, target):
+    history = inspect(target).attrs.username.history
+    changed = object_session(target).info.setdefault(_CHANGED_USERS, set())
+    changed.update([target.username, *history.deleted])
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for username in session.info.pop(_CHANGED_USERS, ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop(_CHANGED_USERS, None)
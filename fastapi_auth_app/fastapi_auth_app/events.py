@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+# Events a subscriber may have queued before it counts as too slow and is dropped.
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Seconds between SSE comments that keep idle connections (and proxies) alive.
+EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+
+
+class Subscription:
+    __slots__ = ("board_id", "queue", "dropped")
+
+    def __init__(self, board_id: int, queue_size: int):
+        self.board_id = board_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class BoardEventHub:
+    """In-process pub/sub of board changes.
+
+    Each event is serialized once and the same bytes are queued for every
+    subscriber of the board. Queues are bounded: a subscriber that falls
+    behind is disconnected rather than buffered for. Only clients connected
+    to this worker see its events.
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        if queue_size < 1:
+            # asyncio.Queue(maxsize=0) is unbounded, which would turn off the backpressure
+            raise ValueError(f"EVENT_QUEUE_SIZE must be at least 1, got {queue_size}")
+        self.queue_size = queue_size
+        self.published = 0
+        self.dropped = 0
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, board_id: int):
+        subscription = Subscription(board_id, self.queue_size)
+        self._subscribers[board_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.board_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.board_id]
+
+    def publish(self, board_id: int, event_type: str, data: dict):
+        subscribers = self._subscribers.get(board_id)
+        if not subscribers:
+            return
+        self.published += 1
+        message = f"event: {event_type}\ndata: {json.dumps({'board_id': board_id, **data})}\n\n".encode()
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        self.dropped += 1
+        subscription.dropped = True
+        self.unsubscribe(subscription)
+        # throw away the backlog and wake the reader so it can close the stream
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def stats(self):
+        return {
+            "boards": len(self._subscribers),
+            "subscribers": sum(len(subs) for subs in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+    async def stream(self, subscription: Subscription, keepalive: float = EVENT_KEEPALIVE):
+        """Server-sent events body for one subscriber; unsubscribes when the client goes away."""
+        try:
+            yield b": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    yield b"event: dropped\ndata: {}\n\n"
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+
+hub = BoardEventHub()
@@ -0,0 +1,368 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from fastapi.routing import APIRoute
+from starlette.routing import Mount
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+# Requests issuing more statements than this are logged (or fail, with QUERY_COUNT_RAISE=1),
+# which is how N+1 patterns from lazy relationship loads show up.
+QUERY_COUNT_THRESHOLD = int(os.getenv("QUERY_COUNT_THRESHOLD", "25"))
+QUERY_COUNT_RAISE = os.getenv("QUERY_COUNT_RAISE", "0") == "1"
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self, budget: int | None = None, raise_on_exceed: bool = False, parent=None):
+        self.parent = parent  # enclosing counter, which sees these statements too
+        self.budget = budget
+        self.raise_on_exceed = raise_on_exceed
+        self.count = 0
+        self.statements = []
+
+    def record(self, statement: str):
+        self.count += 1
+        self.statements.append(statement)
+        if self.raise_on_exceed and self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(f"{self.count} SQL statements, budget is {self.budget}")
+
+
+_current_counter = contextvars.ContextVar("query_counter", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    while counter is not None:
+        counter.record(statement)
+        counter = counter.parent
+    if _current_timings.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    timings = _current_timings.get()
+    started = conn.info.get("query_started")
+    if timings is not None and started:
+        timings.db += time.perf_counter() - started.pop()
+
+@event.listens_for(Engine, "handle_error")
+def _forget_failed_statement(exception_context):
+    started = exception_context.connection and exception_context.connection.info.get("query_started")
+    if started:
+        started.pop()
+
+@contextmanager
+def count_queries(budget: int | None = None, raise_on_exceed: bool = False):
+    """Count SQL statements run by this task (and anything it awaits) inside the block."""
+    counter = QueryCounter(budget, raise_on_exceed, parent=_current_counter.get())
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """For tests: fail as soon as more than ``budget`` statements run inside the block."""
+    with count_queries(budget, raise_on_exceed=True) as counter:
+        yield counter
+
+async def lift_query_budget():
+    """Route dependency for endpoints whose statement count grows with their input (import, export).
+
+    Removes the budget of every enclosing counter, so the request is neither
+    logged nor failed for its size.
+    """
+    counter = _current_counter.get()
+    while counter is not None:
+        counter.budget = None
+        counter = counter.parent
+
+
+class QueryCountMiddleware:
+    """Counts statements per HTTP request and reports them in an X-Query-Count header.
+
+    Tests driving the app through a client can assert on that header to keep
+    per-endpoint statement budgets.
+    """
+
+    def __init__(self, app, threshold: int = QUERY_COUNT_THRESHOLD, raise_on_exceed: bool = QUERY_COUNT_RAISE):
+        self.app = app
+        self.threshold = threshold
+        self.raise_on_exceed = raise_on_exceed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with count_queries(self.threshold, self.raise_on_exceed) as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"x-query-count", str(counter.count).encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
+
+        if counter.budget is not None and counter.count > counter.budget:
+            logger.warning(
+                "%s %s ran %d SQL statements (threshold %d)",
+                scope["method"], scope["path"], counter.count, self.threshold,
+            )
+
+
+# Histogram buckets in seconds, shared by the request, database and serialization timings.
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Streamed responses (exports, server-sent events) last from seconds to hours.
+STREAM_BUCKETS = (0.1, 1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Prometheus histogram with one series per tuple of label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets=METRICS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        bucket_labels = (*self.labelnames, "le")
+        for labels, values in sorted(series.items()):
+            for bound, count in zip((*self.buckets, "+Inf"), values):
+                yield f"{self.name}_bucket{_format_labels(bucket_labels, (*labels, bound))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {values[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {values[-2]}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(Counter):
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def render(self):
+        for line in super().render():
+            yield line.replace(" counter", " gauge", 1) if line.startswith("# TYPE") else line
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route"),
+)
+stream_duration = Histogram(
+    "http_stream_duration_seconds", "Lifetime of streamed responses, which are kept out of http_request_duration_seconds.",
+    ("method", "route"), buckets=STREAM_BUCKETS,
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL statements while handling a request.",
+    ("method", "route"),
+)
+request_serialization_time = Histogram(
+    "http_request_serialization_seconds", "Time spent turning endpoint results into response bodies.",
+    ("method", "route"),
+)
+requests_total = Counter("http_requests_total", "Finished requests.", ("method", "route", "status"))
+db_statements_total = Counter("http_request_db_statements_total", "SQL statements run by requests.", ("method", "route"))
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.")
+
+METRICS = [request_duration, stream_duration, request_db_time, request_serialization_time, requests_total, db_statements_total, requests_in_flight]
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+class RequestTimings:
+    __slots__ = ("db", "serialization", "endpoint_returned")
+
+    def __init__(self):
+        self.db = 0.0
+        self.serialization = 0.0
+        self.endpoint_returned = None
+
+_current_timings = contextvars.ContextVar("request_timings", default=None)
+
+@contextmanager
+def timed_serialization():
+    """Count the block as serialization time, for endpoints that render their own body."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.serialization += time.perf_counter() - started
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that records how long FastAPI spends serializing the endpoint's return value.
+
+    That is the time between the endpoint returning and the route handing back a
+    response: response_model validation, dumping to JSON and building the Response.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_return(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current_timings.get()
+            if timings is not None and timings.endpoint_returned is not None:
+                timings.serialization += time.perf_counter() - timings.endpoint_returned
+            return response
+
+        return timed_handler
+
+def _mark_return(endpoint):
+    # functools.wraps keeps the signature FastAPI reads the endpoint's parameters from
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def marked(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            _endpoint_returned()
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def marked(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            _endpoint_returned()
+            return result
+    return marked
+
+def _endpoint_returned():
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.endpoint_returned = time.perf_counter()
+
+
+def _route_label(scope, status):
+    # the route template, not the raw path, so /tasks/1 and /tasks/2 share a series
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "") or "/"
+    # a mounted app (the frontend's static files) gets its mount's template, e.g. "/{path}";
+    # the mount at "/" sees every path the API doesn't have, so its 404s stay "unmatched"
+    endpoint = scope.get("endpoint")
+    if endpoint is not None and status != 404:
+        for mount in getattr(scope.get("app"), "routes", ()):
+            if isinstance(mount, Mount) and mount.app is endpoint:
+                return mount.path_format
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Records per-route latency, SQL and serialization time, and requests in flight.
+
+    Durations run until the response's last byte is sent. A response sent in
+    several body messages (exports, server-sent events) is a stream: its
+    lifetime goes to http_stream_duration_seconds instead of the latency
+    histogram, and it isn't profiled. With a ``profiler``, requests slower than
+    its threshold get their stack samples written out.
+    """
+
+    def __init__(self, app, profiler: profiling.SlowRequestProfiler | None = profiling.profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        status = 500
+        streamed = False
+        sampling = None
+
+        async def send_with_status(message):
+            nonlocal status, streamed, sampling
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and message.get("more_body") and not streamed:
+                streamed = True
+                if sampling is not None:
+                    self.profiler.cancel(sampling)
+                    sampling = None
+            await send(message)
+
+        requests_in_flight.inc()
+        if self.profiler:
+            sampling = self.profiler.begin()
+        started = time.perf_counter()
+        try:
+            with count_queries() as counter:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _current_timings.reset(token)
+            labels = (scope["method"], _route_label(scope, status))
+            (stream_duration if streamed else request_duration).observe(labels, elapsed)
+            request_db_time.observe(labels, timings.db)
+            request_serialization_time.observe(labels, timings.serialization)
+            requests_total.inc((*labels, str(status)))
+            db_statements_total.inc(labels, counter.count)
+            if sampling is not None:
+                self.profiler.end(sampling, elapsed, *labels)
@@ -1,15 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from . import models
-from .database import engine
-from .routes import users, boards, tasks
+from . import assets, migrate
+from .instrumentation import MetricsMiddleware, QueryCountMiddleware
+from .database import async_engine
+from .routes import users, boards, tasks, metrics
 import os
-from fastapi.staticfiles import StaticFiles
 
-models.Base.metadata.create_all(bind=engine)
+# Schema changes run from `python -m fastapi_auth_app.migrate` before the workers
+# start, so booting a worker does no DDL. Set to 1 for a single local process.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "0") == "1"
 
-app = FastAPI(title="Trello Clone App")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrate.migrate)
+    yield
+    await async_engine.dispose()
+
+app = FastAPI(title="Trello Clone App", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,11 +27,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Query-Count"],
 )
+app.add_middleware(QueryCountMiddleware)
+# outermost, so the recorded latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(boards.router)
 app.include_router(tasks.router)
+app.include_router(metrics.router)
 
-frontend_dir = os.path.join(os.path.dirname(__file__), "..", "frontend")
-app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
+# the fingerprinted, precompressed build from `python -m fastapi_auth_app.assets build` when present
+app.mount("/", assets.PrecompressedStaticFiles(directory=assets.static_directory(), html=True), name="frontend")
@@ -0,0 +1,38 @@
+"""Create the database schema, or bring an existing one up to date.
+
+Run it once per deploy, before starting the workers::
+
+    python -m fastapi_auth_app.migrate
+
+Workers don't touch the schema at startup unless MIGRATE_ON_STARTUP=1, which
+is convenient for a single local process.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from . import models, search
+from .database import engine
+
+def migrate(bind=engine):
+    models.Base.metadata.create_all(bind=bind)
+    _add_missing_columns(bind)
+    # create_all skips tables that already exist, so add indexes introduced since then
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    search.install(bind)
+
+def _add_missing_columns(bind):
+    # create_all doesn't alter existing tables; columns added since need a server_default
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        for table in models.Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+if __name__ == "__main__":
+    migrate()
+    print(f"schema up to date at {engine.url.render_as_string(hide_password=True)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -9,6 +9,8 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     password = Column(String)
+    # bumped whenever the user's board list or roles change (see versions.py)
+    boards_version = Column(Integer, nullable=False, default=0, server_default="0")
     #Each user can have multiple boards, but every board has only one owner.
     boards = relationship("Board", back_populates="owner")
     #Each user can be assigned many tasks, but each task belongs to only one user.
@@ -20,6 +22,8 @@ class Board(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # bumped whenever the board's tasks or members change (see versions.py)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     #One user can own many boards, But each board has only one owner.
     owner = relationship("User", back_populates="boards")
     #One Board can have many members (users).
@@ -53,6 +57,13 @@ class Task(Base):
     assignee = relationship("User", back_populates="tasks")  #Many tasks can be assigned to one user
     subtasks = relationship("Subtask", back_populates = "task") #1 Task has multiple Subtasks
 
+    #Board task listings page by id and can filter by status or assignee.
+    __table_args__ = (
+        Index("ix_tasks_board_id_id", "board_id", "id"),
+        Index("ix_tasks_board_id_status_id", "board_id", "status", "id"),
+        Index("ix_tasks_board_id_assignee_id_id", "board_id", "assignee_id", "id"),
+    )
+
 class Subtask(Base):
     __tablename__ = "subtasks"
 
@@ -60,4 +71,9 @@ class Subtask(Base):
     title = Column(String)
     task_id = Column(Integer, ForeignKey("tasks.id"))
 
-    task = relationship("Task", back_populates="subtasks") #many subtasks belong to a task
\ No newline at end of file
+    task = relationship("Task", back_populates="subtasks") #many subtasks belong to a task
+
+    # export looks subtasks up by their task, a batch of tasks at a time
+    __table_args__ = (
+        Index("ix_subtasks_task_id", "task_id"),
+    )
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+from typing import Optional, Protocol
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .cache import TTLCache
+
+
+class MembershipBackend(Protocol):
+    """Where (user_id, board_id) -> role lookups are cached.
+
+    The default keeps them in process. A shared store (e.g. Redis) implementing
+    the same methods can be installed with ``set_backend`` so several workers
+    see each other's invalidations.
+    """
+
+    def get(self, key, default=None): ...
+    def set(self, key, value, ttl: float | None = None): ...
+    def delete(self, key): ...
+    def clear(self): ...
+    def stats(self) -> dict: ...
+
+
+# Set MEMBERSHIP_CACHE_SIZE=0 or MEMBERSHIP_CACHE_TTL=0 to always ask the database.
+backend: MembershipBackend = TTLCache(
+    maxsize=int(os.getenv("MEMBERSHIP_CACHE_SIZE", "50000")),
+    ttl=float(os.getenv("MEMBERSHIP_CACHE_TTL", "60")),
+)
+
+def set_backend(new_backend: MembershipBackend):
+    global backend
+    backend = new_backend
+
+def remember(user_id: int, board_id: int, role: str):
+    backend.set((user_id, board_id), role)
+
+def invalidate(user_id: int, board_id: int):
+    """Call whenever a membership is added, removed or its role changes."""
+    backend.delete((user_id, board_id))
+
+async def get_role(db: AsyncSession, user_id: int, board_id: int) -> Optional[str]:
+    # only memberships are cached, so a user added to a board is seen straight away
+    role = backend.get((user_id, board_id))
+    if role is None:
+        role = await db.scalar(select(models.BoardMember.role).where(
+            models.BoardMember.board_id == board_id,
+            models.BoardMember.user_id == user_id
+        ))
+        if role is not None:
+            remember(user_id, board_id, role)
+    return role
+
+async def require_member(db: AsyncSession, board_id: int, user: models.User, detail: str = "Access denied"):
+    role = await get_role(db, user.id, board_id)
+    if role is None:
+        raise HTTPException(status_code=403, detail=detail)
+    return role
+
+async def member_board_ids(db: AsyncSession, user: models.User, board_ids) -> set:
+    """The subset of ``board_ids`` the user belongs to, with one query for all cache misses."""
+    allowed, missing = set(), []
+    for board_id in board_ids:
+        if backend.get((user.id, board_id)) is not None:
+            allowed.add(board_id)
+        else:
+            missing.append(board_id)
+    if missing:
+        rows = await db.execute(select(models.BoardMember.board_id, models.BoardMember.role).where(
+            models.BoardMember.user_id == user.id,
+            models.BoardMember.board_id.in_(missing)
+        ))
+        for board_id, role in rows:
+            remember(user.id, board_id, role)
+            allowed.add(board_id)
+    return allowed
@@ -0,0 +1,124 @@
+"""Opt-in sampling profiler for slow requests.
+
+Set PROFILE_SLOW_REQUESTS_MS to turn it on. While a request is in flight, a
+background thread samples the event loop thread's stack every
+PROFILE_INTERVAL_MS and keeps the samples taken while that request's task was
+running. Requests slower than the threshold get their samples written to
+PROFILE_DIR as folded stacks (one ``frame;frame;frame count`` line per stack),
+which flamegraph.pl, inferno and speedscope read directly.
+
+Only time the request spends running Python on the event loop shows up;
+time spent awaiting the database is in the http_request_db_seconds metric.
+Streamed responses (exports, server-sent events) are not profiled.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SLOW_REQUESTS_MS = os.getenv("PROFILE_SLOW_REQUESTS_MS")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+
+class _Sampling:
+    __slots__ = ("task", "loop", "thread_id", "samples")
+
+    def __init__(self, task, loop, thread_id):
+        self.task = task
+        self.loop = loop
+        self.thread_id = thread_id
+        self.samples = Counter()  # folded stack -> number of samples
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms: float, interval_ms: float = PROFILE_INTERVAL_MS, output_dir: str = PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self.written = 0
+        self._active = {}  # id(sampling) -> _Sampling
+        self._lock = threading.Lock()
+        self._thread = None
+        self._sequence = itertools.count()
+
+    def begin(self):
+        """Start keeping samples for the current task; pass the result to ``end``."""
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        sampling = _Sampling(task, asyncio.get_running_loop(), threading.get_ident())
+        with self._lock:
+            self._active[id(sampling)] = sampling
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+                self._thread.start()
+        return sampling
+
+    def cancel(self, sampling):
+        """Stop sampling without writing anything, e.g. once a request turns out to be a stream."""
+        if sampling is not None:
+            with self._lock:
+                self._active.pop(id(sampling), None)
+
+    def end(self, sampling, elapsed: float, method: str, route: str):
+        if sampling is None:
+            return
+        self.cancel(sampling)
+        if elapsed < self.threshold or not sampling.samples:
+            return
+        path = self._write(sampling.samples, elapsed, method, route)
+        logger.warning(
+            "%s %s took %.0f ms; %d stack samples written to %s",
+            method, route, elapsed * 1000, sum(sampling.samples.values()), path,
+        )
+
+    def _write(self, samples, elapsed, method, route):
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r"\W+", "_", route).strip("_")[:60] or "root"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(self._sequence)}-{method}-{slug}-{elapsed * 1000:.0f}ms.folded"
+        path = os.path.join(self.output_dir, name)
+        with open(path, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        return path
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = {}
+            for sampling in active:
+                # a sample belongs to the request whose task the loop is running right now
+                if asyncio.current_task(sampling.loop) is not sampling.task:
+                    continue
+                frame = frames.get(sampling.thread_id)
+                if frame is None:
+                    continue
+                if sampling.thread_id not in stacks:
+                    stacks[sampling.thread_id] = _fold(frame)
+                sampling.samples[stacks[sampling.thread_id]] += 1
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+profiler = SlowRequestProfiler(float(PROFILE_SLOW_REQUESTS_MS)) if PROFILE_SLOW_REQUESTS_MS else None
@@ -1,27 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import models, schemas, auth
+import json
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, auth, permissions, versions
+from ..events import hub
 from ..database import get_db
+from ..instrumentation import InstrumentedRoute, lift_query_budget, timed_serialization
 
-router = APIRouter(prefix="/boards", tags=["Boards"])
+router = APIRouter(prefix="/boards", tags=["Boards"], route_class=InstrumentedRoute)
+
+# rows fetched / inserted per round-trip by export and import
+STREAM_BATCH_SIZE = 1000
+# longest NDJSON line import accepts; one task with its subtasks
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+
+_board_list = TypeAdapter(list[schemas.ShowBoardWithRole])
 
 @router.post("/", response_model=schemas.ShowBoardWithRole)
-def create_board(
+async def create_board(
     board: schemas.BoardCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: models.User = Depends(auth.get_current_user)
 ):
-    # 1️⃣ Create the board
+    # 1️⃣ Create the board and 2️⃣ add the user as a board member with role = 'owner',
+    # both flushed in the same transaction
     new_board = models.Board(name=board.name, owner_id=user.id)
-    db.add(new_board)
-    db.commit()
-    db.refresh(new_board)
-
-    # 2️⃣ Add the user as a board member with role = 'owner'
-    new_member = models.BoardMember(board_id=new_board.id, user_id=user.id, role="owner")
-    db.add(new_member)
-    db.commit()
-    db.refresh(new_member)
+    new_member = models.BoardMember(board=new_board, user_id=user.id, role="owner")
+    db.add_all([new_board, new_member])
+    await versions.user_boards_changed(db, user.id)
+    await db.commit()
+    permissions.remember(user.id, new_board.id, new_member.role)
 
     # 3️⃣ Return both board info + role
     return {
@@ -35,75 +46,219 @@ def create_board(
 #     return db.query(models.Board).filter(models.Board.owner_id == user.id).all()
 
 @router.get("/all", response_model=list[schemas.ShowBoardWithRole])
-def get_boards(db: Session = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+async def get_boards(request: Request, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    return await versions.conditional_json(
+        request,
+        ("boards", user.id),
+        lambda: versions.user_version(db, user.id),
+        lambda: _render_boards(db, user),
+    )
+
+async def _render_boards(db: AsyncSession, user: models.User):
     # Join BoardMember table to include boards where user is a member
     boards = (
-        db.query(models.Board, models.BoardMember.role)
-        .join(models.BoardMember, models.Board.id == models.BoardMember.board_id)
-        .filter(models.BoardMember.user_id == user.id)
-        .all()
-    )
+        await db.execute(
+            select(models.Board, models.BoardMember.role)
+            .join(models.BoardMember, models.Board.id == models.BoardMember.board_id)
+            .where(models.BoardMember.user_id == user.id)
+        )
+    ).all()
 
     # Convert results into list of dicts
     result = [
         {"id": b.Board.id, "name": b.Board.name, "role": b.role}
         for b in boards
     ]
-    return result
+    with timed_serialization():
+        return _board_list.dump_json(_board_list.validate_python(result)), {}
 
 @router.put("/role")
-def change_member_role(
+async def change_member_role(
     data: schemas.RoleChange,
     current_user: models.User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     
      #1.Valid role check
     
-    vaild_roles = ["Viewer","Owner", "Member"] 
-    if data.new_role not in vaild_roles:
+    # roles are stored lowercase ("owner" by create_board); accept any case from the client
+    vaild_roles = ["viewer", "owner", "member"]
+    new_role = data.new_role.lower()
+    if new_role not in vaild_roles:
         raise HTTPException(status_code=400, detail="Invalid role")  
     
     # 2.Check Board exists?
     
-    board = db.query(models.Board).filter(models.Board.id== data.board_id).first()
+    board = await db.scalar(select(models.Board).where(models.Board.id== data.board_id))
     if not board: 
         raise HTTPException(status_code = 404, detail ="Board not found")   
     
     #3.Current user Owner or only Owner can change roles
 
-    membership =(
-        db.query(models.BoardMember)
-        .filter(
-            models.BoardMember.board_id == data.board_id,
-            models.BoardMember.user_id == current_user.id,
-            models.BoardMember.role == "Owner"
-        ).first()
-    )
-    if not membership:
+    if (await permissions.get_role(db, current_user.id, data.board_id) or "").lower() != "owner":
         raise HTTPException(status_code=403, detail= "only owner can change roles")
 
 
     #4.find user whose role will be changed
     target_member = (
-        db.query(models.BoardMember)
-        .filter(
-            models.BoardMember.board_id == data.borad.id,
-            models.BoardMember.user_id == data.user.id
-        ).first()
+        await db.scalar(select(models.BoardMember)
+        .where(
+            models.BoardMember.board_id == data.board_id,
+            models.BoardMember.user_id == data.user_id
+        ))
     )
     if not target_member:
         raise HTTPException(status_code=404, detail= "user is not a member pof this board")  
 
     #update Role
-    target_member.role= data.new_role
-    db.commit()
+    target_member.role= new_role
+    await versions.board_changed(db, data.board_id)
+    await versions.user_boards_changed(db, data.user_id)
+    await db.commit()
+    permissions.invalidate(data.user_id, data.board_id)
+    hub.publish(data.board_id, "member.updated", {"user_id": data.user_id, "role": target_member.role})
 
     return{
         "message": "Updated Role",
         "user_id": data.user_id,
         "board_id": data.board_id,
         "new_role": target_member.role
-    }                          
-           
-               
\ No newline at end of file
+    }
+
+
+async def _export_lines(bind, board_id: int):
+    # Uses its own session on the same engine: the body is produced after the request's session is closed.
+    async with AsyncSession(bind=bind) as db:
+        task_columns = (
+            models.Task.id, models.Task.title, models.Task.description,
+            models.Task.status, models.Task.assignee_id,
+        )
+        result = await db.stream(
+            select(*task_columns)
+            .where(models.Task.board_id == board_id)
+            .order_by(models.Task.id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        async for batch in result.mappings().partitions():
+            subtasks = {}
+            rows = await db.execute(
+                select(models.Subtask.task_id, models.Subtask.id, models.Subtask.title)
+                .where(models.Subtask.task_id.in_([task["id"] for task in batch]))
+                .order_by(models.Subtask.id)
+            )
+            for task_id, subtask_id, title in rows:
+                subtasks.setdefault(task_id, []).append({"id": subtask_id, "title": title})
+            yield "".join(
+                json.dumps({**task, "subtasks": subtasks.get(task["id"], [])}) + "\n"
+                for task in batch
+            )
+
+@router.get("/{board_id}/export", dependencies=[Depends(lift_query_budget)])
+async def export_board(board_id: int, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    """Stream every task of the board, with its subtasks, as one JSON object per line."""
+    await permissions.require_member(db, board_id, user)
+    await db.close()  # don't hold the request's connection while the export streams
+    return StreamingResponse(
+        _export_lines(db.bind, board_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="board-{board_id}.ndjson"'},
+    )
+
+async def _ndjson_lines(request: Request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > MAX_IMPORT_LINE_BYTES:
+                raise HTTPException(status_code=413, detail=f"NDJSON lines are limited to {MAX_IMPORT_LINE_BYTES} bytes")
+            yield line
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"NDJSON lines are limited to {MAX_IMPORT_LINE_BYTES} bytes")
+    yield buffer
+
+def _spooled_batches(spool):
+    spool.seek(0)
+    batch = []
+    for line in spool:
+        batch.append(json.loads(line))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _insert_batch(db: AsyncSession, board_id: int, batch: list):
+    task_ids = await db.scalars(
+        insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+        [
+            {"title": task["title"], "description": task["description"], "status": task["status"],
+             "assignee_id": task["assignee_id"], "board_id": board_id}
+            for task in batch
+        ],
+    )
+    subtasks = [
+        {"task_id": task_id, "title": subtask["title"]}
+        for task_id, task in zip(task_ids, batch)
+        for subtask in task["subtasks"]
+    ]
+    if subtasks:
+        await db.execute(insert(models.Subtask), subtasks)
+    return len(subtasks)
+
+@router.post("/{board_id}/import", dependencies=[Depends(lift_query_budget)])
+async def import_board(board_id: int, request: Request, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    """Add tasks from an NDJSON body (the export format) to the board.
+
+    Ids in the input are ignored; tasks and subtasks get new ones. The whole
+    body is read and validated before anything is written, so a bad line adds
+    nothing. The inserts are then committed STREAM_BATCH_SIZE tasks at a time,
+    which keeps other writers from waiting on one long transaction: the import
+    is not atomic, and a failure part way through the inserts (a lost
+    connection, a crash) leaves the batches committed so far on the board.
+    """
+    await permissions.require_member(db, board_id, user)
+    await db.close()  # no connection is needed while the body uploads
+
+    with tempfile.TemporaryFile() as spool:
+        line_no = 0
+        async for line in _ndjson_lines(request):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                task = schemas.TaskImport.model_validate_json(line)
+            except ValidationError as e:
+                raise HTTPException(status_code=400, detail=f"Line {line_no}: {e.errors()[0]['msg']}")
+            spool.write(task.model_dump_json().encode() + b"\n")
+
+        task_count, subtask_count = 0, 0
+        for batch in _spooled_batches(spool):
+            subtask_count += await _insert_batch(db, board_id, batch)
+            task_count += len(batch)
+            await versions.board_changed(db, board_id)
+            await db.commit()
+
+    hub.publish(board_id, "tasks.imported", {"tasks": task_count, "subtasks": subtask_count})
+    return {"board_id": board_id, "tasks": task_count, "subtasks": subtask_count}
+
+@router.post("/{board_id}/events/token")
+async def board_events_token(board_id: int, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    """Token for ``new EventSource(`/boards/${id}/events?token=${token}`)``, which can't send an Authorization header."""
+    await permissions.require_member(db, board_id, user)
+    return {"token": auth.create_stream_token(user.username, board_id), "expires_in": auth.STREAM_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/{board_id}/events")
+async def board_events(board_id: int, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_stream_user)):
+    """Server-sent events for task and member changes on the board, instead of polling.
+
+    Authenticate with the usual Bearer header or, from a browser EventSource,
+    with ``?token=`` from POST /boards/{board_id}/events/token.
+    """
+    await permissions.require_member(db, board_id, user)
+    await db.close()  # the stream may stay open for hours; give the connection back now
+    return StreamingResponse(
+        hub.stream(hub.subscribe(board_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from ..instrumentation import InstrumentedRoute, PROMETHEUS_CONTENT_TYPE, render_metrics
+
+router = APIRouter(tags=["Metrics"], route_class=InstrumentedRoute)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request metrics in the Prometheus text format, for scraping."""
+    return Response(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
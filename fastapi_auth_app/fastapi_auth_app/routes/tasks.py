@@ -1,32 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import models, schemas, auth
+import base64
+import binascii
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas, auth, permissions, search, versions
+from ..events import hub
 from ..database import get_db
+from ..instrumentation import InstrumentedRoute, timed_serialization
 
-router = APIRouter(prefix="/tasks", tags=["Tasks"])
+router = APIRouter(prefix="/tasks", tags=["Tasks"], route_class=InstrumentedRoute)
+
+# columns a ?fields= projection may ask for; id is always returned
+TASK_FIELDS = ("id", "title", "description", "status")
+
+_task_list = TypeAdapter(list[schemas.ShowTaskFields])
+
+def _encode_cursor(board_id: int, last_id: int):
+    return base64.urlsafe_b64encode(f"{board_id}:{last_id}".encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, board_id: int):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_board, last_id = (int(part) for part in raw.split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_board != board_id:
+        raise HTTPException(status_code=400, detail="Cursor belongs to another board")
+    return last_id
 
 @router.post("/", response_model=schemas.ShowTask)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
-    membership = db.query(models.BoardMember).filter(
-        models.BoardMember.board_id == task.board_id,
-        models.BoardMember.user_id == user.id
-    ).first()
-    if not membership:
-        raise HTTPException(status_code=403, detail="You are not a member of this board")
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    await permissions.require_member(db, task.board_id, user, detail="You are not a member of this board")
 
     # new_task = models.Task(**task.dict())
     new_task = models.Task(**task.model_dump())
     db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    await versions.board_changed(db, new_task.board_id)
+    await db.commit()
+    await db.refresh(new_task)
+    hub.publish(new_task.board_id, "task.created", schemas.ShowTask.model_validate(new_task).model_dump())
     return new_task
 
-@router.get("/{board_id}", response_model=list[schemas.ShowTask])
-def get_tasks(board_id: int, db: Session = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
-    membership = db.query(models.BoardMember).filter(
-        models.BoardMember.board_id == board_id,
-        models.BoardMember.user_id == user.id
-    ).first()
-    if not membership:
-        raise HTTPException(status_code=403, detail="Access denied")
-    return db.query(models.Task).filter(models.Task.board_id == board_id).all()
+@router.post("/bulk", response_model=list[schemas.BulkItemResult], response_model_exclude_none=True)
+async def create_tasks_bulk(data: schemas.TaskBulkCreate, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    """Create many tasks in one transaction; results are reported per item, in input order."""
+    allowed = await permissions.member_board_ids(db, user, {task.board_id for task in data.tasks})
+    results = [
+        schemas.BulkItemResult(index=i, result="error", detail="You are not a member of this board")
+        for i in range(len(data.tasks))
+    ]
+    accepted = [i for i, task in enumerate(data.tasks) if task.board_id in allowed]
+    if accepted:
+        new_ids = await db.scalars(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            [data.tasks[i].model_dump() for i in accepted],
+        )
+        created = {}
+        for i, task_id in zip(accepted, new_ids):
+            results[i] = schemas.BulkItemResult(index=i, id=task_id, result="created")
+            created.setdefault(data.tasks[i].board_id, []).append(task_id)
+        await versions.boards_changed(db, created)
+        await db.commit()
+        for board_id, task_ids in created.items():
+            hub.publish(board_id, "tasks.created", {"ids": task_ids})
+    return results
+
+@router.patch("/bulk", response_model=list[schemas.BulkItemResult], response_model_exclude_none=True)
+async def update_tasks_bulk(data: schemas.TaskBulkUpdate, db: AsyncSession = Depends(get_db), user: models.User = Depends(auth.get_current_user)):
+    """Apply partial updates to many tasks in one transaction; only the fields sent are changed."""
+    ids = {task.id for task in data.tasks}
+    task_boards = dict((await db.execute(
+        select(models.Task.id, models.Task.board_id).where(models.Task.id.in_(ids))
+    )).all())
+    allowed = await permissions.member_board_ids(db, user, set(task_boards.values()))
+
+    results, changes, changed = [], [], {}
+    for i, task in enumerate(data.tasks):
+        if task.id not in task_boards:
+            results.append(schemas.BulkItemResult(index=i, id=task.id, result="error", detail="Task not found"))
+        elif task_boards[task.id] not in allowed:
+            results.append(schemas.BulkItemResult(index=i, id=task.id, result="error", detail="You are not a member of this board"))
+        else:
+            values = task.model_dump(exclude_unset=True)
+            nulls = [name for name in schemas.TASK_REQUIRED_FIELDS if name in values and values[name] is None]
+            if nulls:
+                results.append(schemas.BulkItemResult(index=i, id=task.id, result="error", detail=f"{', '.join(nulls)} cannot be null"))
+            elif len(values) == 1:
+                # nothing but the id was sent
+                results.append(schemas.BulkItemResult(index=i, id=task.id, result="unchanged"))
+            else:
+                results.append(schemas.BulkItemResult(index=i, id=task.id, result="updated"))
+                changes.append(values)
+                changed.setdefault(task_boards[task.id], []).append(values)
+    if changes:
+        # ORM bulk UPDATE by primary key: one executemany per distinct set of columns
+        await db.execute(update(models.Task), changes)
+        await versions.boards_changed(db, changed)
+        await db.commit()
+        for board_id, board_changes in changed.items():
+            hub.publish(board_id, "tasks.updated", {"tasks": board_changes})
+    return results
+
+# declared before /{board_id} so "search" isn't taken for a board id
+@router.get("/search", response_model=list[schemas.TaskSearchResult])
+async def search_tasks(
+    q: str = Query(..., min_length=1),
+    board_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(auth.get_current_user)
+):
+    """Ranked full-text search over tasks and subtasks on the caller's boards."""
+    return await search.search_tasks(db, user.id, q, limit, offset, board_id)
+
+@router.get("/{board_id}", response_model=list[schemas.ShowTaskFields], response_model_exclude_unset=True)
+async def get_tasks(
+    board_id: int,
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated subset of: " + ", ".join(TASK_FIELDS)),
+    status: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+    user: models.User = Depends(auth.get_current_user)
+):
+    await permissions.require_member(db, board_id, user)
+    return await versions.conditional_json(
+        request,
+        ("tasks", board_id),
+        lambda: versions.board_version(db, board_id),
+        lambda: _render_tasks(db, board_id, limit, cursor, fields, status, assignee_id),
+    )
+
+async def _render_tasks(db, board_id, limit, cursor, fields, status, assignee_id):
+    # Keyset pagination on (board_id, id): each page starts right after the last id of the previous one
+    if fields:
+        wanted = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = wanted - set(TASK_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        columns = [getattr(models.Task, name) for name in TASK_FIELDS if name == "id" or name in wanted]
+    else:
+        columns = [getattr(models.Task, name) for name in TASK_FIELDS]
+
+    query = select(*columns).where(models.Task.board_id == board_id)
+    if status is not None:
+        query = query.where(models.Task.status == status)
+    if assignee_id is not None:
+        query = query.where(models.Task.assignee_id == assignee_id)
+    if cursor:
+        query = query.where(models.Task.id > _decode_cursor(cursor, board_id))
+    rows = (await db.execute(query.order_by(models.Task.id).limit(limit + 1))).mappings().all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(board_id, rows[-1]["id"])
+    with timed_serialization():
+        body = _task_list.dump_json(_task_list.validate_python([dict(row) for row in rows]), exclude_unset=True)
+    return body, headers
@@ -1,20 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas, utils, auth
 from ..database import get_db
+from ..instrumentation import InstrumentedRoute
 from fastapi.security import OAuth2PasswordRequestForm
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=InstrumentedRoute)
  
 @router.post("/register", response_model=schemas.ShowUser)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if db.query(models.User).filter(models.User.username == user.username).first():
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    if await db.scalar(select(models.User).where(models.User.username == user.username)):
         raise HTTPException(status_code=400, detail="Username already exists")
-    hashed_pwd = utils.hash_password(user.password)
+    hashed_pwd = await utils.hash_password_async(user.password)
     new_user = models.User(username=user.username, email=user.email, password=hashed_pwd)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 # @router.post("/login")
@@ -27,9 +29,9 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-def login(data: schemas.LoginRequest, db:Session =Depends(get_db)):
-    user = db.query(models.User).filter(models.User.username==data.username).first()
-    if not user or not utils.verify_password(data.password, user.password):
+async def login(data: schemas.LoginRequest, db:AsyncSession =Depends(get_db)):
+    user = await db.scalar(select(models.User).where(models.User.username==data.username))
+    if not user or not await utils.verify_password_async(data.password, user.password):
         raise HTTPException(status_code=400, detail="Invalid Credentials")
     token = auth.create_access_token({"sub": user.username})
     return {"access_token": token,
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 
 class UserCreate(BaseModel):
@@ -29,6 +29,39 @@ class TaskCreate(BaseModel):
     assignee_id: Optional[int] = None
 
 
+class TaskSearchResult(BaseModel):
+    id: int
+    board_id: int
+    title: str
+    status: str
+    rank: Optional[float] = None  # lower is better; only set by the FTS5 backend
+
+# upper bound on items per bulk request, keeps one transaction from running away
+BULK_MAX_ITEMS = 5000
+
+class TaskBulkCreate(BaseModel):
+    tasks: list[TaskCreate] = Field(max_length=BULK_MAX_ITEMS)
+
+# fields a task update may leave out but may not set to null
+TASK_REQUIRED_FIELDS = ("title", "status")
+
+class TaskUpdate(BaseModel):
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    assignee_id: Optional[int] = None
+
+class TaskBulkUpdate(BaseModel):
+    tasks: list[TaskUpdate] = Field(max_length=BULK_MAX_ITEMS)
+
+class BulkItemResult(BaseModel):
+    index: int                  # position in the request's list
+    id: Optional[int] = None
+    result: str                 # "created", "updated", "unchanged" or "error"
+    detail: Optional[str] = None
+
+
 class ShowBoardWithRole(BaseModel):
     id: int
     name: str
@@ -45,6 +78,26 @@ class ShowTask(BaseModel):
     class Config:
         from_attributes = True
 
+class ShowTaskFields(BaseModel):
+    # same as ShowTask, but a ?fields= projection may leave columns out
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+class SubtaskImport(BaseModel):
+    title: str
+
+class TaskImport(BaseModel):
+    # one line of a board export / import
+    title: str
+    description: Optional[str] = None
+    status: str = "To Do"
+    assignee_id: Optional[int] = None
+    subtasks: list[SubtaskImport] = []
+
 class InviteMember(BaseModel):
     username_or_email: str
     role: str = "member"        # default value
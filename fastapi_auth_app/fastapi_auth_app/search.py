@@ -0,0 +1,122 @@
+"""Full-text search over task titles, descriptions and subtask titles.
+
+On SQLite this is an FTS5 table, ``task_search``, whose rowid is the task id.
+Triggers on ``tasks`` and ``subtasks`` keep it in sync, including for bulk
+inserts that bypass the ORM. Other databases fall back to ILIKE.
+
+Rebuild the index from the tables with::
+
+    python -m fastapi_auth_app.search rebuild
+"""
+import re
+import sys
+from sqlalchemy import inspect, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+
+# runs on every subtask write; ix_subtasks_task_id keeps it a lookup instead of a table scan
+SUBTASK_TITLES_QUERY = "SELECT group_concat(title, ' ') FROM subtasks WHERE task_id = {task_id}"
+_SUBTASK_TITLES = f"coalesce(({SUBTASK_TITLES_QUERY}), '')"
+
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5(title, description, subtasks, tokenize='unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS task_search_task_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_search(rowid, title, description, subtasks)
+        VALUES (new.id, new.title, new.description, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_search_task_update AFTER UPDATE OF title, description ON tasks BEGIN
+        UPDATE task_search SET title = new.title, description = new.description WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_search_task_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_search WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_subtask_insert AFTER INSERT ON subtasks BEGIN
+        UPDATE task_search SET subtasks = {_SUBTASK_TITLES.format(task_id="new.task_id")} WHERE rowid = new.task_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_subtask_update AFTER UPDATE OF title, task_id ON subtasks BEGIN
+        UPDATE task_search SET subtasks = {_SUBTASK_TITLES.format(task_id="old.task_id")} WHERE rowid = old.task_id;
+        UPDATE task_search SET subtasks = {_SUBTASK_TITLES.format(task_id="new.task_id")} WHERE rowid = new.task_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS task_search_subtask_delete AFTER DELETE ON subtasks BEGIN
+        UPDATE task_search SET subtasks = {_SUBTASK_TITLES.format(task_id="old.task_id")} WHERE rowid = old.task_id;
+    END""",
+]
+
+# bm25 column weights: a hit in the title counts most, then subtasks, then description
+RANK = "bm25(task_search, 10.0, 1.0, 3.0)"
+
+def install(engine):
+    """Create the index and its triggers if missing; fills it when it is new."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        created = not inspect(conn).has_table("task_search")
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        if created:
+            _fill(conn)
+
+def rebuild(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM task_search"))
+        _fill(conn)
+
+def _fill(conn):
+    conn.execute(text(f"""
+        INSERT INTO task_search(rowid, title, description, subtasks)
+        SELECT id, title, description, {_SUBTASK_TITLES.format(task_id="tasks.id")} FROM tasks
+    """))
+
+def to_match_query(q: str):
+    """Turn free text into an FTS5 query: all words must match, the last one as a prefix."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+async def search_tasks(db: AsyncSession, user_id: int, q: str, limit: int, offset: int, board_id: int | None = None):
+    """Best matches first, restricted to boards the user is a member of."""
+    if db.bind.dialect.name != "sqlite":
+        return await _search_like(db, user_id, q, limit, offset, board_id)
+    match = to_match_query(q)
+    if match is None:
+        return []
+    board_filter = "AND t.board_id = :board_id" if board_id is not None else ""
+    rows = await db.execute(text(f"""
+        SELECT t.id, t.board_id, t.title, t.status, {RANK} AS rank
+        FROM task_search
+        JOIN tasks t ON t.id = task_search.rowid
+        JOIN board_members m ON m.board_id = t.board_id AND m.user_id = :user_id
+        WHERE task_search MATCH :match {board_filter}
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "user_id": user_id, "board_id": board_id, "limit": limit, "offset": offset})
+    return rows.mappings().all()
+
+async def _search_like(db, user_id, q, limit, offset, board_id):
+    pattern = f"%{q}%"
+    query = (
+        select(models.Task.id, models.Task.board_id, models.Task.title, models.Task.status)
+        .join(models.BoardMember, models.BoardMember.board_id == models.Task.board_id)
+        .where(
+            models.BoardMember.user_id == user_id,
+            or_(models.Task.title.ilike(pattern), models.Task.description.ilike(pattern)),
+        )
+        .order_by(models.Task.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    if board_id is not None:
+        query = query.where(models.Task.board_id == board_id)
+    return (await db.execute(query)).mappings().all()
+
+
+if __name__ == "__main__":
+    from .database import engine
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python -m fastapi_auth_app.search rebuild")
+    install(engine)
+    rebuild(engine)
+    print("task_search rebuilt")
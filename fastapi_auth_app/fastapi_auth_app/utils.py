@@ -1,9 +1,80 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def hash_password(password: str):
+def _hash(password: str):
     return pwd_context.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str):
+def _verify(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt on its own pool so auth bursts can't take over the request threadpool.
+
+    At most ``workers + queue_limit`` jobs are admitted at once; anything beyond
+    that is rejected straight away with a 503 instead of waiting in line.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, kind: str = "thread"):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.kind = kind
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # created lazily so importing the app doesn't fork worker processes
+        with self._lock:
+            if self._executor is None:
+                pool = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                self._executor = pool(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    queue_limit=int(os.getenv("PASSWORD_HASH_QUEUE", "8")),
+    kind=os.getenv("PASSWORD_HASH_EXECUTOR", "thread"),
+)
+
+def hash_password(password: str):
+    return hasher.submit(_hash, password).result()
+
+def verify_password(plain_password: str, hashed_password: str):
+    return hasher.submit(_verify, plain_password, hashed_password).result()
+
+async def hash_password_async(password: str):
+    return await asyncio.wrap_future(hasher.submit(_hash, password))
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await asyncio.wrap_future(hasher.submit(_verify, plain_password, hashed_password))
@@ -0,0 +1,78 @@
+import hashlib
+import os
+from fastapi import Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from .cache import ResponseCache
+
+# Listings are versioned per board (tasks) and per user (their board list). The versions
+# are columns, boards.version and users.boards_version, bumped in the same transaction as
+# every write that changes what a GET would return, so every worker (and every process
+# on the database) agrees on them. Writes made outside the app must bump them as well.
+CONDITIONAL_GET = os.getenv("CONDITIONAL_GET", "1") != "0"
+
+response_cache = ResponseCache(max_bytes=int(float(os.getenv("RESPONSE_CACHE_MB", "32")) * 1024 * 1024))
+
+async def boards_changed(db: AsyncSession, board_ids):
+    """Call inside the transaction of a task or member change on these boards, before committing."""
+    await db.execute(
+        update(models.Board)
+        .where(models.Board.id.in_(set(board_ids)))
+        .values(version=models.Board.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def board_changed(db: AsyncSession, board_id: int):
+    await boards_changed(db, [board_id])
+
+async def user_boards_changed(db: AsyncSession, user_id: int):
+    """Call inside the transaction that changes which boards a user is on, or their role there."""
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(boards_version=models.User.boards_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def board_version(db: AsyncSession, board_id: int):
+    return await db.scalar(select(models.Board.version).where(models.Board.id == board_id))
+
+async def user_version(db: AsyncSession, user_id: int):
+    return await db.scalar(select(models.User.boards_version).where(models.User.id == user_id))
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: str | None, etag: str):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as RFC 9110 asks for If-None-Match
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+async def conditional_json(request: Request, key: tuple, version, render):
+    """Serve a JSON GET whose content is fully determined by ``key``, its version and the query string.
+
+    ``version`` is an async callable returning the current version of ``key``.
+    ``render`` is an async callable returning ``(body_bytes, headers)``; it only runs
+    when neither the client's ETag nor the response cache can answer.
+    """
+    if not CONDITIONAL_GET:
+        body, headers = await render()
+        return Response(body, media_type="application/json", headers=headers)
+
+    key = (*key, await version(), request.url.query)
+    etag = make_etag(*key)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+
+    cached = response_cache.get(key)
+    if cached is None:
+        cached = await render()
+        response_cache.set(key, cached, size=len(cached[0]))
+    body, headers = cached
+    return Response(body, media_type="application/json", headers={**headers, **cache_headers})
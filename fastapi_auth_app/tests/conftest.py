@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# database.py reads DATABASE_URL at import, so point it at a throwaway file before anything imports the app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='trello-tests-'), 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import pytest
+
+from fastapi_auth_app import migrate
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate.migrate()
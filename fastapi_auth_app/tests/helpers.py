@@ -0,0 +1,32 @@
+import asyncio
+import itertools
+
+import httpx
+
+from fastapi_auth_app import auth, database
+from fastapi_auth_app.main import app
+
+_usernames = (f"tester{i}" for i in itertools.count())
+
+
+def run(scenario, asgi_app=app):
+    async def main():
+        transport = httpx.ASGITransport(app=asgi_app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await scenario(client)
+        finally:
+            # each test gets its own event loop; pooled aiosqlite connections can't cross loops
+            await database.async_engine.dispose()
+    asyncio.run(main())
+
+
+async def new_user(client):
+    username = next(_usernames)
+    response = await client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": "secret"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': username})}"}
+
+
+def username_of(headers):
+    return auth.jwt.get_unverified_claims(headers["Authorization"].removeprefix("Bearer "))["sub"]
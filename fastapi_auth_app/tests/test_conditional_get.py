@@ -0,0 +1,34 @@
+"""Listing versions live in the database, so writes from other workers invalidate ETags and cached bodies."""
+from fastapi_auth_app import database, models, versions
+from helpers import new_user, run
+
+
+def test_write_from_another_session_is_seen():
+    async def scenario(client):
+        headers = await new_user(client)
+        board_id = (await client.post("/boards/", json={"name": "versions"}, headers=headers)).json()["id"]
+        first = await client.get(f"/tasks/{board_id}", headers=headers)
+        assert first.json() == []
+
+        # what another worker does: its own session, the task and the version bump in one transaction
+        async with database.AsyncSessionLocal() as other:
+            other.add(models.Task(title="from elsewhere", status="To Do", board_id=board_id))
+            await versions.board_changed(other, board_id)
+            await other.commit()
+
+        revalidated = await client.get(f"/tasks/{board_id}", headers={**headers, "If-None-Match": first.headers["etag"]})
+        assert revalidated.status_code == 200
+        assert [task["title"] for task in revalidated.json()] == ["from elsewhere"]
+
+    run(scenario)
+
+
+def test_unchanged_listing_is_not_modified():
+    async def scenario(client):
+        headers = await new_user(client)
+        await client.post("/boards/", json={"name": "versions"}, headers=headers)
+        first = await client.get("/boards/all", headers=headers)
+        again = await client.get("/boards/all", headers={**headers, "If-None-Match": first.headers["etag"]})
+        assert again.status_code == 304
+
+    run(scenario)
@@ -0,0 +1,74 @@
+"""Board import: writes from other requests go on while an import uploads."""
+import asyncio
+import json
+
+from fastapi_auth_app import database
+from fastapi_auth_app.routes import boards
+from helpers import new_user, run
+
+
+def _lines(count):
+    return "".join(json.dumps({"title": f"imported {i}", "subtasks": [{"title": "sub"}]}) + "\n" for i in range(count)).encode()
+
+
+def test_slow_import_does_not_block_other_writers(monkeypatch):
+    # fail fast instead of waiting out the default busy timeout if the import holds the write lock
+    monkeypatch.setitem(database.SQLITE_PRAGMAS, "busy_timeout", 200)
+
+    async def scenario(client):
+        importer, other = await new_user(client), await new_user(client)
+        import_board = (await client.post("/boards/", json={"name": "import"}, headers=importer)).json()["id"]
+        other_board = (await client.post("/boards/", json={"name": "other"}, headers=other)).json()["id"]
+        written = asyncio.Event()
+
+        async def body():
+            yield _lines(boards.STREAM_BATCH_SIZE + 1)  # more than one batch's worth
+            await written.wait()  # the upload stalls until the other user's write is through
+            yield _lines(10)
+
+        async def write():
+            await asyncio.sleep(0.5)
+            try:
+                return await client.post("/tasks/", json={"title": "meanwhile", "board_id": other_board}, headers=other)
+            finally:
+                written.set()
+
+        imported, created = await asyncio.gather(
+            client.post(f"/boards/{import_board}/import", content=body(), headers=importer),
+            write(),
+        )
+        assert created.status_code == 200
+        assert imported.status_code == 200
+        assert imported.json()["tasks"] == boards.STREAM_BATCH_SIZE + 11
+
+    run(scenario)
+
+
+def test_invalid_line_imports_nothing():
+    async def scenario(client):
+        headers = await new_user(client)
+        board_id = (await client.post("/boards/", json={"name": "import"}, headers=headers)).json()["id"]
+        body = _lines(boards.STREAM_BATCH_SIZE + 1) + b'{"description": "no title"}\n'
+        response = await client.post(f"/boards/{board_id}/import", content=body, headers=headers)
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith(f"Line {boards.STREAM_BATCH_SIZE + 2}:")
+        assert (await client.get(f"/tasks/{board_id}", headers=headers)).json() == []
+
+    run(scenario)
+
+
+def test_overlong_line_is_rejected(monkeypatch):
+    monkeypatch.setattr(boards, "MAX_IMPORT_LINE_BYTES", 1024)
+
+    async def scenario(client):
+        headers = await new_user(client)
+        board_id = (await client.post("/boards/", json={"name": "import"}, headers=headers)).json()["id"]
+
+        async def body():
+            for _ in range(10):
+                yield b"x" * 512  # no newline ever comes
+
+        response = await client.post(f"/boards/{board_id}/import", content=body(), headers=headers)
+        assert response.status_code == 413
+
+    run(scenario)
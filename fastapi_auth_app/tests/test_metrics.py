@@ -0,0 +1,46 @@
+"""Streamed responses are kept out of the request latency histogram and the slow-request profiler."""
+from fastapi_auth_app.instrumentation import MetricsMiddleware
+from fastapi_auth_app.main import app
+from fastapi_auth_app.profiling import SlowRequestProfiler
+from helpers import new_user, run
+
+
+def _series(metrics, name, route):
+    return [line for line in metrics.splitlines() if line.startswith(f"{name}_count") and f'route="{route}"' in line]
+
+
+def test_streams_have_their_own_histogram(tmp_path):
+    profiler = SlowRequestProfiler(threshold_ms=0, interval_ms=1, output_dir=str(tmp_path))
+    profiled = MetricsMiddleware(app, profiler=profiler)
+
+    async def scenario(client):
+        headers = await new_user(client)
+        board_id = (await client.post("/boards/", json={"name": "metrics"}, headers=headers)).json()["id"]
+        for i in range(3):
+            await client.post("/tasks/", json={"title": f"task {i}", "board_id": board_id}, headers=headers)
+        export = await client.get(f"/boards/{board_id}/export", headers=headers)
+        assert export.status_code == 200
+        assert len(export.text.splitlines()) == 3
+
+        metrics = (await client.get("/metrics")).text
+        route = "/boards/{board_id}/export"
+        assert _series(metrics, "http_stream_duration_seconds", route)
+        assert not _series(metrics, "http_request_duration_seconds", route)
+        assert _series(metrics, "http_request_duration_seconds", "/boards/")
+
+    run(scenario, profiled)
+    assert not [path for path in tmp_path.iterdir() if "export" in path.name]
+
+
+def test_static_files_are_not_unmatched():
+    async def scenario(client):
+        for path in ("/index.html", "/styles.css", "/app.js"):
+            assert (await client.get(path)).status_code == 200
+        assert (await client.get("/no-such-page.html")).status_code == 404
+
+        metrics = (await client.get("/metrics")).text
+        assert 'http_requests_total{method="GET",route="/{path}",status="200"} 3' in metrics
+        assert 'http_requests_total{method="GET",route="unmatched",status="200"}' not in metrics
+        assert 'route="unmatched",status="404"}' in metrics
+
+    run(scenario)
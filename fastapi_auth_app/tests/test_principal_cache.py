@@ -0,0 +1,43 @@
+"""The cached principal is dropped once a change to the user commits, not when it flushes."""
+from sqlalchemy import select
+
+from fastapi_auth_app import auth, database, models
+from helpers import new_user, run, username_of
+
+
+def test_read_between_flush_and_commit_does_not_keep_the_old_user():
+    async def scenario(client):
+        headers = await new_user(client)
+        username = username_of(headers)
+
+        async with database.AsyncSessionLocal() as db:
+            user = await db.scalar(select(models.User).where(models.User.username == username))
+            user.email = f"changed-{username}@example.com"
+            await db.flush()
+            auth.invalidate_user(username)
+            # another request misses the cache and reads the row as last committed
+            assert (await client.get("/boards/all", headers=headers)).status_code == 200
+            assert auth.principal_cache.get(username).email == f"{username}@example.com"
+            await db.commit()
+
+        assert auth.principal_cache.get(username) is None
+
+    run(scenario)
+
+
+def test_rolled_back_change_keeps_the_cached_user():
+    async def scenario(client):
+        headers = await new_user(client)
+        username = username_of(headers)
+        assert (await client.get("/boards/all", headers=headers)).status_code == 200
+
+        async with database.AsyncSessionLocal() as db:
+            user = await db.scalar(select(models.User).where(models.User.username == username))
+            user.email = f"changed-{username}@example.com"
+            await db.flush()
+            await db.rollback()
+            await db.commit()  # the rolled back change must not invalidate on a later commit either
+
+        assert auth.principal_cache.get(username) is not None
+
+    run(scenario)
@@ -0,0 +1,62 @@
+"""Per-endpoint SQL statement budgets.
+
+Requests run in the test's own task through ASGITransport, so
+``assert_max_queries`` sees every statement the request issues.
+"""
+import json
+
+from fastapi_auth_app.instrumentation import QueryCountMiddleware, assert_max_queries
+from fastapi_auth_app.main import app
+from fastapi_auth_app.routes import boards
+from helpers import new_user, run
+
+def test_create_board_budget():
+    async def scenario(client):
+        headers = await new_user(client)
+        await client.get("/boards/all", headers=headers)  # caches the principal
+        with assert_max_queries(3):
+            response = await client.post("/boards/", json={"name": "budget"}, headers=headers)
+        assert response.status_code == 200
+
+    run(scenario)
+
+
+def test_list_tasks_budget():
+    async def scenario(client):
+        headers = await new_user(client)
+        board_id = (await client.post("/boards/", json={"name": "budget"}, headers=headers)).json()["id"]
+        for i in range(20):
+            await client.post("/tasks/", json={"title": f"task {i}", "board_id": board_id}, headers=headers)
+        with assert_max_queries(2):
+            response = await client.get(f"/tasks/{board_id}", headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) == 20
+
+    run(scenario)
+
+
+def test_query_count_header():
+    async def scenario(client):
+        headers = await new_user(client)
+        response = await client.post("/boards/", json={"name": "budget"}, headers=headers)
+        assert int(response.headers["x-query-count"]) <= 4  # the principal isn't cached yet
+
+    run(scenario)
+
+
+def test_import_is_exempt_from_the_request_budget(monkeypatch):
+    monkeypatch.setattr(boards, "STREAM_BATCH_SIZE", 1)
+    strict = QueryCountMiddleware(app, threshold=3, raise_on_exceed=True)
+
+    async def scenario(client):
+        headers = await new_user(client)
+        await client.get("/boards/all", headers=headers)  # caches the principal, to keep board creation within budget
+        board_id = (await client.post("/boards/", json={"name": "budget"}, headers=headers)).json()["id"]
+        body = "".join(json.dumps({"title": f"imported {i}", "subtasks": [{"title": "sub"}]}) + "\n" for i in range(10))
+        response = await client.post(f"/boards/{board_id}/import", content=body, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["tasks"] == 10
+        # both middlewares add the header; either way well over the strict budget
+        assert int(response.headers.get_list("x-query-count")[0]) > 3
+
+    run(scenario, strict)
@@ -0,0 +1,12 @@
+"""The search index triggers must stay cheap: they run for every task and subtask write."""
+from sqlalchemy import text
+
+from fastapi_auth_app import database, search
+
+
+def test_subtask_triggers_look_up_by_index():
+    # the statement task_search_subtask_* run to rebuild a task's subtask titles
+    statement = "EXPLAIN QUERY PLAN " + search.SUBTASK_TITLES_QUERY.format(task_id="1")
+    with database.engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(statement)))
+    assert "ix_subtasks_task_id" in plan, plan
@@ -0,0 +1,54 @@
+"""Board-scoped ``?token=`` for EventSource: it opens that board's event stream and nothing else."""
+from datetime import timedelta
+
+from fastapi_auth_app import auth, database
+from helpers import new_user, run, username_of
+
+
+async def _two_boards(client):
+    headers = await new_user(client)
+    board_a = (await client.post("/boards/", json={"name": "a"}, headers=headers)).json()["id"]
+    board_b = (await client.post("/boards/", json={"name": "b"}, headers=headers)).json()["id"]
+    return headers, board_a, board_b
+
+
+def test_stream_token_opens_only_its_board():
+    async def scenario(client):
+        headers, board_a, board_b = await _two_boards(client)
+        response = await client.post(f"/boards/{board_a}/events/token", headers=headers)
+        assert response.status_code == 200
+        token = response.json()["token"]
+
+        async with database.AsyncSessionLocal() as db:
+            user = await auth.get_stream_user(board_a, token=token, credentials=None, db=db)
+        assert user.username == username_of(headers)
+        # a member of both boards, so only the token's scope can turn this away
+        response = await client.get(f"/boards/{board_b}/events", params={"token": token})
+        assert response.status_code == 401
+
+    run(scenario)
+
+
+def test_scoped_token_is_rejected_elsewhere():
+    async def scenario(client):
+        headers, board_a, _ = await _two_boards(client)
+        token = auth.create_stream_token(username_of(headers), board_a)
+        response = await client.get("/boards/all", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+        # the same token as a header on the stream itself goes through get_current_user too
+        response = await client.get(f"/boards/{board_a}/events", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
+
+    run(scenario)
+
+
+def test_expired_stream_token_is_rejected():
+    async def scenario(client):
+        headers, board_a, _ = await _two_boards(client)
+        token = auth.create_access_token(
+            {"sub": username_of(headers), "scope": f"events:{board_a}"}, timedelta(seconds=-1),
+        )
+        response = await client.get(f"/boards/{board_a}/events", params={"token": token})
+        assert response.status_code == 401
+
+    run(scenario)